@@ -1,43 +1,29 @@
 #!/usr/bin/env python3.11
 from enum import Enum, auto
 from typing import List
-import tempfile,subprocess,os
-
-class _RegMeta(type):
-  _special = dict(
-      SP="sp",
-      LR="lr",
-      FP="fp",
-      XZR="xzr",
-      WZR="wzr"
-  )
-
-  def __getattr__(cls, name):
-    # Handle special registers
-    if name in cls._special: return cls._special[name]
-
-    # Handle Xn and Wn (0 <= n < 30)
-    if name.startswith("X"):
-      try:
-        idx = int(name[1:])
-        if 0 <= idx < 30:
-          return f"x{idx}"
-      except ValueError: pass
-
-    if name.startswith("W"):
-      try:
-        idx = int(name[1:])
-        if 0 <= idx < 30:
-          return f"w{idx}"
-      except ValueError: pass
-
-    raise AttributeError(f"Register '{name}' is not defined.")
-
-class Reg(metaclass=_RegMeta):
-    @classmethod
-    def X(cls, i): return f"x{i}" if 0 <= i < 30 else None
-    @classmethod
-    def W(cls, i): return f"w{i}" if 0 <= i < 30 else None
+from itertools import chain
+import tempfile,subprocess,os,shutil
+
+def _register_names(cls):
+  # Isi X0..X29 / W0..W29 sekali saat import, jadi Reg.Xn hanya atribut kelas biasa
+  for i in range(30):
+    setattr(cls, f"X{i}", f"x{i}")
+    setattr(cls, f"W{i}", f"w{i}")
+  return cls
+
+@_register_names
+class Reg:
+  # Special registers
+  SP = "sp"
+  LR = "lr"
+  FP = "fp"
+  XZR = "xzr"
+  WZR = "wzr"
+
+  @classmethod
+  def X(cls, i): return f"x{i}" if 0 <= i < 30 else None
+  @classmethod
+  def W(cls, i): return f"w{i}" if 0 <= i < 30 else None
 
 
 class Inst(Enum):
@@ -47,6 +33,7 @@ class Inst(Enum):
   STR = auto()   # Store Register
   STRB = auto()   # Store Register Byte
   STRH = auto()  # Store Register Harlfworld
+  STP = auto()   # Store Pair of Registers
   ADR = auto()   # Address of a Label
   ADRP = auto()  # Address of a Page
   MOVZ = auto()  # Move with zero
@@ -73,61 +60,126 @@ class Inst(Enum):
   CMP = auto()  # Compare
   TST = auto()  # Test Bits
   CCMP = auto()  # Conditional Compare
+  CSEL = auto()  # Conditional Select
   NOP = auto()  # No Operation
   SVC = auto()  # SuperVisor Call
   RET = auto()  # Return
 
 
+_MOV_IMM = "\t mov {}, #{}".format
+_MOV_REG = "\t mov {}, {}".format
+_ADD = "\t add {}, {}, {}".format
+_MOVE_WIDE = "\t {} {}, #{}".format
+_MOVE_WIDE_SHIFT = "\t {} {}, #{}, lsl #{}".format
+_STP = "\t stp {}, {}, [{}, #{}]".format
+_STRB = "\t strb {}, [{}, #{}]".format
+_STORE = "\t {} {}, [{}, #{}]".format
+_STORE_BASE = "\t {} {}, [{}]".format
+_CONDS = frozenset(("eq", "ne", "cs", "hs", "cc", "lo", "mi", "pl", "vs", "vc", "hi", "ls", "ge", "lt", "gt", "le", "al", "nv"))
+
+def _emit_mov(op, args):
+  dst, src = args
+  return _MOV_IMM(dst, src) if isinstance(src, int) else _MOV_REG(dst, src)
+
+def _emit_add(op, args): return _ADD(*args)
+
+def _emit_move_wide(op, args):
+  if len(args) == 2: return _MOVE_WIDE(op.name.lower(), *args)
+  if len(args) != 4 or args[2] not in ['LSL','LSR']: raise ValueError( f"{op} expects 2 or 4 arguments, got {args}")
+  dst, imm, shift_type, shift = args
+  assert shift_type == "LSL" and shift in [0,16,32,48], "Instruksi ini tidak sah !"
+  return _MOVE_WIDE_SHIFT(op.name.lower(), dst, imm, shift)
+
+def _emit_sub(op, args):
+  dst, src = args
+  return f"\t sub {dst}, {dst}, #{src}"
+
+def _emit_cmp(op, args):
+  src1, src2 = args
+  return f"\t cmp {src1}, #{src2}" if isinstance(src2, int) else f"\t cmp {src1}, {src2}"
+
+def _check_cond(op, cond):
+  cond = cond.lower()
+  if cond not in _CONDS: raise ValueError(f"{op.name.lower()}: unknown condition '{cond}'")
+  return cond
+
+def _emit_ccmp(op, args):
+  src1, src2, nzcv, cond = args
+  if isinstance(src2, int):
+    if not 0 <= src2 <= 31: raise ValueError(f"ccmp immediate must be in 0..31, got {src2}")
+    src2 = f"#{src2}"
+  if not 0 <= nzcv <= 15: raise ValueError(f"ccmp nzcv must be in 0..15, got {nzcv}")
+  return f"\t ccmp {src1}, {src2}, #{nzcv}, {_check_cond(op, cond)}"
+
+def _emit_csel(op, args):
+  dst, src1, src2, cond = args
+  return f"\t csel {dst}, {src1}, {src2}, {_check_cond(op, cond)}"
+
+def _emit_svc(op, args): return f"\t svc #{args[0]}"
+
+def _emit_stp(op, args):
+  src1, src2, (base, offset) = args
+  return _STP(src1, src2, base, offset)
+
+def _emit_strb(op, args):
+  src, addr = args
+  # Bentuk umum [base, #offset] langsung lewat template, sisanya ke _emit_store
+  if isinstance(addr, (list, tuple)) and len(addr) == 2: return _STRB(src, *addr)
+  return _emit_store(op, args)
+
+def _emit_store(op, args):
+  src, addr = args
+  if isinstance(addr, (list, tuple)):
+    if len(addr) == 1:
+      return _STORE_BASE(op.name.lower(), src, addr[0])
+    elif len(addr) == 2:
+      return _STORE(op.name.lower(), src, *addr)
+    else:
+      raise ValueError(
+          f"{op.name.lower()} instruction requires 2 or 3 arguments, got {len(args)}")
+  else:
+    raise ValueError(f"Unknown instruction: {op}")
+
 class Instruction:
+  _EMITTERS = {
+    Inst.MOV: _emit_mov,
+    Inst.ADD: _emit_add,
+    Inst.RET: lambda op, args: "\t ret",
+    Inst.NOP: lambda op, args: "\t nop",
+    Inst.MOVZ: _emit_move_wide,
+    Inst.MOVK: _emit_move_wide,
+    Inst.SUB: _emit_sub,
+    Inst.SVC: _emit_svc,
+    Inst.CMP: _emit_cmp,
+    Inst.CCMP: _emit_ccmp,
+    Inst.CSEL: _emit_csel,
+    Inst.STP: _emit_stp,
+    Inst.STR: _emit_store,
+    Inst.STRB: _emit_strb,
+    Inst.STRH: _emit_store,
+  }
+
+  __slots__ = ("op", "args")
+
   def __init__(self, op: Inst, args):
     self.op = op
-    self.args = args
+    self.args = args if isinstance(args, tuple) else tuple(args)
 
   def emit(self):
-    if self.op == Inst.MOV:
-      dst, src = self.args
-      return f"\t mov {dst}, #{src}" if isinstance(src, int) else f"\t mov {dst}, {src}"
-    elif self.op == Inst.ADD:
-      dst, src1, src2 = self.args
-      return f"\t add {dst}, {src1}, {src2}"
-    elif self.op == Inst.RET: return "\t ret"
-    elif self.op == Inst.NOP: return "\t nop"
-    elif self.op in [Inst.MOVK, Inst.MOVZ]:
-      if len(self.args) == 2:
-        dst, imm = self.args
-        return f"\t {self.op.name.lower()} {dst}, #{imm}"
-      elif len(self.args) == 4 and self.args[2] in ['LSL','LSR']:
-        dst, imm, shift_type, shift = self.args
-        shift_type_lower = shift_type.lower()
-        assert self.op == Inst.MOVZ and shift_type == "LSL" and shift in [0,16,32,48], "Instruksi ini tidak sah !"
-        return f"\t {self.op.name.lower()} {dst}, #{imm}, {shift_type_lower} #{shift}"
-      else: raise ValueError( f"{self.op} expects 2 or 4 arguments, got {self.args}")
-    elif self.op == Inst.SUB:
-      dst, src = self.args
-      return f"\t sub {dst}, {dst}, #{src}"
-    elif self.op == Inst.SVC:
-      dst = self.args[0]
-      return f"\t svc #{dst}"
-    elif self.op in [Inst.STR, Inst.STRB, Inst.STRH]:
-      src, addr = self.args
-      if isinstance(addr, list):
-        if len(addr) == 1:
-          base = addr[0]
-          return f"\t {self.op.name.lower()} {src}, [{base}]"
-        elif len(self.args) == 2:
-          base, offset = addr
-          return f"\t {self.op.name.lower()} {src}, [{base}, #{offset}]"
-        else:
-          raise ValueError(
-              f"{self.op.name.lower()} instruction requires 2 or 3 arguments, got {len(self.args)}")
-      else:
-        raise ValueError(f"Unknown instruction: {self.op}")
+    try: emitter = self._EMITTERS[self.op]
+    except KeyError: raise ValueError(f"Unknown instruction: {self.op}") from None
+    return emitter(self.op, self.args)
 
 class Codegen:
+  _HEADER = (".section __TEXT,__text", ".global _main", "", "_main:")
+  _clang = shutil.which("clang")
+  _TAIL_STORES = ((8, Inst.STR, Reg.X1), (4, Inst.STR, Reg.W1), (2, Inst.STRH, Reg.W1), (1, Inst.STRB, Reg.W1))
+
   def alloc_size(self, n_size: int): return (n_size + 15) & ~15
 
   def __init__(self):
     self.instructions: List[Instruction] = []
+    self._last_frame = 0
 
   def emit(self, inst: Instruction):
     self.instructions.append(inst)
@@ -139,9 +191,7 @@ class Codegen:
       f.write(self.generate())
 
   def generate(self) -> str:
-    lines = [".section __TEXT,__text", ".global _main", "", "_main:"]
-    for instr in self.instructions: lines.append(instr.emit())
-    return "\n".join(lines)
+    return "\n".join(chain(self._HEADER, map(Instruction.emit, self.instructions)))
 
   def run(self, asm_code: str = None):
     with tempfile.TemporaryDirectory() as tmpdir:
@@ -152,29 +202,36 @@ class Codegen:
 
   def compile(self,filename:str="a", asm_code:str=None,write:bool=True):
     asm_code = self.generate() if asm_code is None else asm_code
-    dir = "build"
-    if dir == "build": os.makedirs(dir, exist_ok=True)
-    if not write: dir = filename
+    if write:
+      dir = "build"
+      os.makedirs(dir, exist_ok=True)
+    else: dir, filename = os.path.split(filename)
     try:
-      asm_path = os.path.join(dir, f"{filename}.s")
-      obj_path = os.path.join(dir, f"{filename}.o")
       exe_path = os.path.join(dir, filename)
 
-      with open(asm_path,"w") as f: f.write(asm_code)
+      if Codegen._clang:
+        # Assemble + link dalam satu proses lewat driver clang
+        result = subprocess.run(
+          [Codegen._clang, "-arch", "arm64", "-x", "assembler", "-o", exe_path, "-", "-Wl,-e,_main"],
+          input=asm_code, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+          check=True, text=True
+        )
+      else:
+        obj_path = os.path.join(dir, f"{filename}.o")
 
-      # Compile dengan assembler
-      subprocess.run(["as", "-o", obj_path, asm_path], check=True)
+        # Compile dengan assembler, source dikirim lewat stdin tanpa file .s
+        subprocess.run(["as", "-o", obj_path, "-"], input=asm_code, stderr=subprocess.PIPE, check=True, text=True)
 
-      # Link menjadi executable
-      result = subprocess.run(
-        [
-          "ld", "-o", exe_path, obj_path,
-          "-lSystem", "-syslibroot", "/Library/Developer/CommandLineTools/SDKs/MacOSX.sdk",
-          "-e", "_main"
-        ],
-        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-        check=True, text=True
-      )
+        # Link menjadi executable
+        result = subprocess.run(
+          [
+            "ld", "-o", exe_path, obj_path,
+            "-lSystem", "-syslibroot", "/Library/Developer/CommandLineTools/SDKs/MacOSX.sdk",
+            "-e", "_main"
+          ],
+          stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+          check=True, text=True
+        )
 
       print(f"\n[INFO] Executable created: {exe_path}")
       if result.stdout:
@@ -187,23 +244,82 @@ class Codegen:
     except Exception as e:
       print(f"[ERROR] Unexpected error:\n{e}")
   
+  def mov_imm(self, reg: str, value: int):
+    if 0 <= value <= 0xFFFF:
+      self.instructions.append(Instruction(Inst.MOV, [reg, value]))
+      return
+    value &= 0xFFFFFFFFFFFFFFFF
+    # Bangun immediate 64-bit: movz untuk halfword pertama, movk untuk sisanya yang bukan nol
+    self.instructions.append(Instruction(Inst.MOVZ, [reg, value & 0xFFFF, "LSL", 0]))
+    for shift in (16, 32, 48):
+      imm = (value >> shift) & 0xFFFF
+      if imm: self.instructions.append(Instruction(Inst.MOVK, [reg, imm, "LSL", shift]))
+
+  def store_bytes(self, data: bytes):
+    n = len(data)
+    off = 0
+    # Peephole: isi terakhir x1 / x2, load ulang dilewati jika nilainya sama
+    held = {}
+    def load(reg, value):
+      if held.get(reg) == value: return
+      other = next((r for r, v in held.items() if v == value), None)
+      if other is None: self.mov_imm(reg, value)
+      else: self.instructions.append(Instruction(Inst.MOV, [reg, other]))
+      held[reg] = value
+
+    # 16 byte sekaligus: x1 (low) dan x2 (high) lalu satu stp
+    while n - off >= 16:
+      load(Reg.X1, int.from_bytes(data[off:off+8], "little"))
+      load(Reg.X2, int.from_bytes(data[off+8:off+16], "little"))
+      # Offset stp hanya sampai 504, selebihnya pakai dua str
+      if off <= 504: self.instructions.append(Instruction(Inst.STP, [Reg.X1, Reg.X2, [Reg.SP, off]]))
+      else:
+        self.instructions.append(Instruction(Inst.STR, [Reg.X1, [Reg.SP, off]]))
+        self.instructions.append(Instruction(Inst.STR, [Reg.X2, [Reg.SP, off + 8]]))
+      off += 16
+    # Sisa (< 16 byte) dengan paling banyak satu str x / str w / strh / strb
+    for size, op, src in self._TAIL_STORES:
+      if n - off >= size:
+        load(Reg.X1, int.from_bytes(data[off:off+size], "little"))
+        self.instructions.append(Instruction(op, [src, [Reg.SP, off]]))
+        off += size
+
+  def emit_select(self, dst: str, true_val, false_val, cond: str):
+    # dst = true_val jika cond terpenuhi (flag dari cmp sebelumnya), selain itu false_val. Tanpa branch.
+    # Konstanta dimuat dulu ke register scratch (x9..x11) yang tidak dipakai dst / operand lain
+    used = {dst, true_val, false_val}
+    def scratch(value):
+      reg = next(r for r in (Reg.X9, Reg.X10, Reg.X11) if r not in used)
+      self.mov_imm(reg, value)
+      used.add(reg)
+      return reg
+    if isinstance(true_val, int): true_val = scratch(true_val)
+    if isinstance(false_val, int): false_val = scratch(false_val)
+    self.instructions.append(Instruction(Inst.CSEL, [dst, true_val, false_val, cond]))
+
   def allocate_stack(self,n_size:int):
-    n_size = self.alloc_size(n_size)
-    self.instructions.append(Instruction(Inst.SUB,[Reg.SP,16]))
+    self._last_frame = self.alloc_size(n_size)
+    self.instructions.append(Instruction(Inst.SUB,[Reg.SP,self._last_frame]))
   
-  def deallocate_stack(self,n_size):
-    n_size = self.alloc_size(n_size)
-    self.instructions.append(Instruction(Inst.ADD, [Reg.SP, Reg.SP, n_size]))
+  def deallocate_stack(self,n_size:int=None):
+    # Tanpa n_size, lepas frame terakhir dari allocate_stack
+    frame = self._last_frame if n_size is None else self.alloc_size(n_size)
+    self.instructions.append(Instruction(Inst.ADD, [Reg.SP, Reg.SP, frame]))
     
-  def syscall_exit(self):
-    # System call number untuk exit
-    self.instructions.append(Instruction(Inst.MOV, [Reg.X16, 1]))
-    # Status exit (0 = Success)
-    self.instructions.append(Instruction(Inst.MOV, [Reg.X0, 0]))
-    # Prefix untuk system call BSD
-    self.instructions.append(Instruction(Inst.MOV, [Reg.X8, 0x2000000]))
-    # Gabungkan: 0x2000001 untuk exit
-    self.instructions.append(Instruction(Inst.ADD, [Reg.X16, Reg.X16, Reg.X8]))
+  def syscall_number(self, sysno: int):
+    """
+    Syscall number di macOS ARM64 disimpan di x16:
+    x16 = 0x2000000 (prefix BSD) + sysno
+    Nilainya konstan, jadi cukup movz bagian atas + movk bagian bawah.
+    """
+    self.instructions.append(Instruction(Inst.MOVZ, [Reg.X16, 0x200, "LSL", 16]))
+    self.instructions.append(Instruction(Inst.MOVK, [Reg.X16, sysno]))
+
+  def syscall_exit(self, status=0):
+    # Status exit (0 = Success), bisa immediate atau register
+    if status != Reg.X0: self.instructions.append(Instruction(Inst.MOV, [Reg.X0, status]))
+    # System call number untuk exit: 0x2000001
+    self.syscall_number(1)
     # Panggil kernel
     self.instructions.append(Instruction(Inst.SVC, [0]))
 
@@ -214,14 +330,8 @@ class Codegen:
     self.instructions.append(Instruction(Inst.MOV, [Reg.X1, Reg.SP]))                 
     # args3 : x2 adalah argumen ketiga syscall write, yaitu panjang data (dalam byte) yang akan ditulis.
     self.instructions.append(Instruction(Inst.MOV, [Reg.X2, n_literal]))              
-    """
-    Syscall number di macOS ARM64 disimpan di x16 dan dihitung:
-    x16 = 4 + 0x2000000 ⟶ x16 = 0x2000004
-    0x2000004 adalah syscall write di macOS.
-    """
-    self.instructions.append(Instruction(Inst.MOV, [Reg.X16, 4]))
-    self.instructions.append(Instruction(Inst.MOV, [Reg.X8, 0x2000000]))
-    self.instructions.append(Instruction(Inst.ADD, [Reg.X16, Reg.X16, Reg.X8]))
+    # 0x2000004 adalah syscall write di macOS.
+    self.syscall_number(4)
 
     # Supervisor Call
     self.instructions.append(Instruction(Inst.SVC, [0]))
@@ -230,31 +340,50 @@ class TemplateInstruction:
   @staticmethod
   def print_sum(a: int, b: int):
     cg = Codegen()
-    c = str(a + b)
+    c = str(a + b).encode()
     cg.allocate_stack(len(c))
+    last_imm = None
     for idx, val in enumerate(c):
-      cg.emit(Instruction(Inst.MOVZ, [Reg.X1, ord(val), "LSL", 0]))
+      # w1 masih berisi digit sebelumnya jika sama, mov tidak perlu diulang
+      if val != last_imm: cg.emit(Instruction(Inst.MOV, [Reg.W1, val]))
+      last_imm = val
       cg.emit(Instruction(Inst.STRB, [Reg.W1, [Reg.SP, idx]]))
     cg.syscall_write(len(c))
-    cg.deallocate_stack(len(c))
+    cg.deallocate_stack()
     cg.syscall_exit()
     return cg
   
   @staticmethod
   def print_str(text:str):
     cg = Codegen()
-    n_literal = len(text)
+    # Panjang dihitung dalam byte, bukan karakter (UTF-8 bisa > 1 byte per karakter)
+    encoded = text.encode()
+    n_literal = len(encoded)
     cg.allocate_stack(n_literal)
 
-    # Memasukkan karakter ASCII satu per satu ke stack
-    for idx, val in enumerate(text):
-      cg.emit(Instruction(Inst.MOV, [Reg.W1, ord(val)]))
-      cg.emit(Instruction(Inst.STRB, [Reg.W1, [Reg.SP, idx]]))
+    # Memasukkan byte literal ke stack per 16 byte
+    cg.store_bytes(encoded)
     cg.syscall_write(n_literal)
-    cg.deallocate_stack(n_literal)
+    cg.deallocate_stack()
     cg.syscall_exit()
     return cg
 
+  @staticmethod
+  def select(cond: str, a: int, b: int):
+    # Exit status = a jika (a cond b), selain itu b
+    cg = Codegen()
+    cg.mov_imm(Reg.X9, a)
+    if 0 <= b <= 0xFFF:
+      # b cukup sebagai immediate cmp, emit_select memuatnya sendiri ke register scratch
+      cg.emit(Instruction(Inst.CMP, [Reg.X9, b]))
+      cg.emit_select(Reg.X0, Reg.X9, b, cond)
+    else:
+      cg.mov_imm(Reg.X10, b)
+      cg.emit(Instruction(Inst.CMP, [Reg.X9, Reg.X10]))
+      cg.emit_select(Reg.X0, Reg.X9, Reg.X10, cond)
+    cg.syscall_exit(Reg.X0)
+    return cg
+
 if __name__ == "__main__":
   text = """
     Lorem Ipsum is simply dummy text of the printing and 